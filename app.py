@@ -2,16 +2,26 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, UploadFile, F
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
 import cv2
 import numpy as np
 import json
-import base64
+import pybase64
+import asyncio
+import struct
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from cachetools import TTLCache
 from typing import List, Optional
 import httpx
 import requests
 from pydantic import BaseModel
 import re
 import os
+import logging
 from dotenv import load_dotenv
 import anthropic
 from google.oauth2.service_account import Credentials
@@ -20,6 +30,10 @@ import uuid
 from datetime import datetime
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="FarmFresh Marketplace - Smart Camera Service",
     description="AI-powered computer vision service for family farms to capture produce weight and manage inventory",
@@ -28,7 +42,79 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Add CORS middleware
+# Compress JSON and HTML responses; small bodies are not worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Reject oversized uploads before their body is read into memory; a 25 MB
+# request is already ~19 MB of decoded image plus the base64 text
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", 25 * 1024 * 1024))
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Answer 413 to HTTP requests whose body exceeds max_bytes.
+
+    A declared Content-Length is checked up front. Bodies without one
+    (chunked transfer encoding) are counted as they are received, so they
+    cannot bypass the limit.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def too_large_response(self) -> JSONResponse:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"Request body exceeds {self.max_bytes} bytes"}
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self.too_large_response()(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Answer 413 ourselves, then tell the app the client has
+                    # gone so it stops reading; anything it sends is dropped
+                    if not rejected and not response_started:
+                        await self.too_large_response()(scope, receive, send)
+                    rejected = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+
+app.add_middleware(RequestSizeLimitMiddleware, max_bytes=MAX_REQUEST_BYTES)
+
+# Add CORS middleware (added last so it also wraps the size guard's responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allows all origins
@@ -51,6 +137,7 @@ claude_client = anthropic.Anthropic(api_key=CLAUDE_API_KEY) if CLAUDE_API_KEY el
 GOOGLE_SHEETS_CREDENTIALS_FILE = os.getenv("GOOGLE_SHEETS_CREDENTIALS_FILE")
 GOOGLE_SHEETS_ID = os.getenv("GOOGLE_SHEETS_ID")
 sheets_service = None
+sheets_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
 
 
 def init_google_sheets():
@@ -67,12 +154,12 @@ def init_google_sheets():
 
             # Build the service
             sheets_service = build('sheets', 'v4', credentials=creds)
-            print("Google Sheets service initialized")
+            logger.info("Google Sheets service initialized")
         except Exception as e:
-            print(f"Error initializing Google Sheets: {e}")
+            logger.exception("Error initializing Google Sheets: %s", e)
             sheets_service = None
     else:
-        print("Google Sheets credentials not found")
+        logger.warning("Google Sheets credentials not found")
 
 async def write_to_google_sheets(data: dict) -> str:
     """Write product data to Google Sheets"""
@@ -110,18 +197,21 @@ async def write_to_google_sheets(data: dict) -> str:
             'values': [row_data]
         }
 
-        result = sheets_service.spreadsheets().values().append(
+        # The API client blocks and its httplib2 transport is not thread-safe,
+        # so appends run one at a time on a dedicated thread
+        append_request = sheets_service.spreadsheets().values().append(
             spreadsheetId=GOOGLE_SHEETS_ID,
             range=range_name,
             valueInputOption='RAW',
             body=body
-        ).execute()
+        )
+        result = await asyncio.get_running_loop().run_in_executor(sheets_pool, append_request.execute)
 
-        print(f"Successfully wrote to Google Sheets: {product_id}")
+        logger.info("Successfully wrote to Google Sheets: %s", product_id)
         return product_id
 
     except Exception as e:
-        print(f"Error writing to Google Sheets: {e}")
+        logger.error("Error writing to Google Sheets: %s", e)
         raise
 
 # def verify_api_key(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -137,6 +227,22 @@ class WeightCaptureRequest(BaseModel):
     image_base64: Optional[str] = None
     image_url: Optional[str] = None
 
+# Binary stream frames start with a fixed 16-byte header: message type (u8),
+# client timestamp in ms (u64, little-endian) and reserved padding, followed
+# by the raw JPEG bytes
+FRAME_HEADER = struct.Struct('<BQ7x')
+FRAME_MESSAGE_TYPE = 1
+
+# Annotated preview frames only need to look right on screen; quality 75 with
+# 4:2:0 chroma subsampling and no optimize/progressive passes encodes far
+# faster than the default quality 95 and produces much smaller messages
+STREAM_JPEG_PARAMS = [
+    cv2.IMWRITE_JPEG_QUALITY, 75,
+    cv2.IMWRITE_JPEG_SAMPLING_FACTOR, cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+    cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+    cv2.IMWRITE_JPEG_PROGRESSIVE, 0,
+]
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
@@ -144,12 +250,12 @@ class ConnectionManager:
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
-        print(f"Client connected. Total connections: {len(self.active_connections)}")
+        logger.info("Client connected. Total connections: %d", len(self.active_connections))
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
-        print(f"Client disconnected. Total connections: {len(self.active_connections)}")
+        logger.info("Client disconnected. Total connections: %d", len(self.active_connections))
 
     async def send_message(self, message: str, websocket: WebSocket):
         try:
@@ -157,35 +263,136 @@ class ConnectionManager:
         except:
             self.disconnect(websocket)
 
+    async def send_bytes(self, data: bytes, websocket: WebSocket):
+        try:
+            await websocket.send_bytes(data)
+        except:
+            self.disconnect(websocket)
+
 manager = ConnectionManager()
 
-# Use smaller model to reduce memory footprint
+# Produce detection model: a callable taking a BGR frame and returning
+# (annotated_frame, detection_result). None until a model ships with the
+# service; /ws/stream refuses connections while it is unset
 model = None
 
+# Blocking work runs off the event loop: Claude requests are network-bound
+# and can overlap, local detection is serialized on a single thread, and
+# image decode/hash/encode (which release the GIL) get one thread per CPU
+claude_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="claude")
+detection_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="detection")
+image_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="image")
+
+# Frames whose average hashes differ in fewer bits than this reuse the
+# previous detection instead of re-running the model
+FRAME_HASH_THRESHOLD = 5
+
+
+def average_hash(frame: np.ndarray) -> int:
+    """Compute a 64-bit average hash of a frame from an 8x8 grayscale thumbnail"""
+    small = cv2.resize(frame, (8, 8), interpolation=cv2.INTER_AREA).mean(axis=2)
+    bits = (small > small.mean()).astype(np.uint8)
+    return int(np.packbits(bits).view('>u8')[0])
+
 
-async def extract_weight_from_scale(frame: np.ndarray) -> dict:
+def decode_stream_frame(data: bytes):
+    """Decode the JPEG payload of a stream message into (frame, average_hash), or None if undecodable"""
+    # The JPEG payload follows the header; decode it in place
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8, offset=FRAME_HEADER.size), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    return frame, average_hash(frame)
+
+
+def detect_and_encode(frame: np.ndarray):
+    """Run the detection model on a frame and return (annotated_jpeg, detection_result)"""
+    annotated_frame, result = model(frame)
+    _, buffer = cv2.imencode('.jpg', annotated_frame, STREAM_JPEG_PARAMS)
+    return buffer.tobytes(), result
+
+
+# Recent Claude results keyed by the SHA-1 of the raw image bytes
+weight_cache = TTLCache(maxsize=1024, ttl=300)
+
+# Claude downsamples images whose long edge exceeds this, so shrinking first
+# saves JPEG encode work and upload bytes without losing usable detail
+CLAUDE_MAX_IMAGE_EDGE = 1568
+
+
+def resize_for_claude(frame: np.ndarray) -> np.ndarray:
+    """Downscale a frame so its long edge fits within CLAUDE_MAX_IMAGE_EDGE"""
+    height, width = frame.shape[:2]
+    scale = CLAUDE_MAX_IMAGE_EDGE / max(height, width)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def decode_base64_image(image_base64: str) -> bytes:
+    """Decode a base64 image, tolerating surrounding whitespace and missing padding"""
+    image_base64 = image_base64.strip()
+    padding = len(image_base64) % 4
+    if padding:
+        image_base64 += '=' * (4 - padding)
+    return pybase64.b64decode(image_base64, validate=False)
+
+
+def image_digest(image_data: bytes) -> bytes:
+    """SHA-1 of the raw image bytes, used as the weight cache key"""
+    return hashlib.sha1(image_data).digest()
+
+
+def encode_for_claude(image_data: bytes) -> Optional[str]:
+    """Decode raw image bytes and re-encode them as a base64 JPEG sized for Claude, or None if undecodable"""
+    frame = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    _, buffer = cv2.imencode('.jpg', resize_for_claude(frame), [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return pybase64.b64encode(buffer).decode('ascii')
+
+
+VALID_CATEGORIES = frozenset({'vegetables', 'fruits', 'dairy', 'grains', 'meat', 'other'})
+
+# Fallback results are shared across requests; callers only read them
+CLAUDE_NOT_CONFIGURED_RESULT = {
+    'weight': 0.0,
+    'unit': 'g',
+    'confidence': 0.0,
+    'error': 'Claude API key not configured',
+    'method': 'claude_api'
+}
+
+WEIGHT_READ_FAILED_RESULT = {
+    'weight': 0.0,
+    'unit': 'g',
+    'name': 'Unknown',
+    'description': 'Unable to identify',
+    'category': 'Other',
+    'confidence': 0.0,
+    'error': 'Failed to read weight from image',
+    'method': 'claude_api'
+}
+
+
+async def extract_weight_from_scale(image_base64: str) -> dict:
     """
     Extract weight from digital scale display using Claude API.
+
+    image_base64 is a base64 JPEG as produced by encode_for_claude.
     """
     if not claude_client:
-        print("Claude API key not configured. Set CLAUDE_API_KEY environment variable.")
-        return {
-            'weight': 0.0,
-            'unit': 'g',
-            'confidence': 0.0,
-            'error': 'Claude API key not configured',
-            'method': 'claude_api'
-        }
+        logger.warning("Claude API key not configured. Set CLAUDE_API_KEY environment variable.")
+        return CLAUDE_NOT_CONFIGURED_RESULT
 
     try:
-        # Convert image to base64 for Claude API
-        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
-
-        # Call Claude API using the official SDK
-        message = claude_client.messages.create(
+        # Call Claude API using the official SDK; the client is synchronous,
+        # so run it on a worker thread to keep the event loop free
+        message = await asyncio.get_running_loop().run_in_executor(claude_pool, partial(
+            claude_client.messages.create,
             model="claude-haiku-4-5",  # fastest model
             max_tokens=100,
+            # The answer is a flat JSON object, so stop as soon as it closes
+            stop_sequences=["}"],
             messages=[
                 {
                     "role": "user",
@@ -231,14 +438,17 @@ Focus on both the digital display area and the produce item. Return ONLY the JSO
                     ]
                 }
             ]
-        )
+        ))
 
         # Extract content from response
         content = message.content[0].text
+        # The matched stop sequence is not included in the returned text
+        if message.stop_reason == "stop_sequence":
+            content += message.stop_sequence
 
         # Parse Claude's response
         try:
-            print(f"🔍 Claude raw response: {content}")
+            logger.debug("🔍 Claude raw response: %s", content)
 
             # Try to parse the entire response as JSON first
             try:
@@ -249,7 +459,7 @@ Focus on both the digital display area and the produce item. Return ONLY the JSO
                 if json_match:
                     weight_data = json.loads(json_match.group())
                 else:
-                    print(f"❌ No valid JSON found in Claude response: {content}")
+                    logger.warning("❌ No valid JSON found in Claude response: %s", content)
                     raise ValueError("No valid JSON found")
 
             # Validate the response
@@ -262,12 +472,11 @@ Focus on both the digital display area and the produce item. Return ONLY the JSO
                 confidence = float(weight_data['confidence'])
 
                 # Validate category
-                valid_categories = ['vegetables', 'fruits', 'dairy', 'grains', 'meat', 'other']
-                if category not in valid_categories:
-                    print(f"⚠️ Invalid category '{category}', defaulting to 'Other'")
+                if category not in VALID_CATEGORIES:
+                    logger.warning("⚠️ Invalid category '%s', defaulting to 'Other'", category)
                     category = 'Other'
 
-                print(f"✅ Claude detected: {name} - {weight} {unit} ({category}, confidence: {confidence:.2f})")
+                logger.info("✅ Claude detected: %s - %s %s (%s, confidence: %.2f)", name, weight, unit, category, confidence)
 
                 return {
                     'weight': weight,
@@ -284,26 +493,87 @@ Focus on both the digital display area and the produce item. Return ONLY the JSO
                 }
             else:
                 missing_fields = [field for field in ['weight', 'unit', 'name', 'description', 'category', 'confidence'] if field not in weight_data]
-                print(f"❌ Invalid Claude response format: {weight_data}")
-                print(f"   Missing required fields: {missing_fields}")
+                logger.warning("❌ Invalid Claude response format: %s (missing required fields: %s)",
+                               weight_data, missing_fields)
 
         except (json.JSONDecodeError, ValueError, KeyError) as e:
-            print(f"Error parsing Claude response: {e}")
-            print(f"   Response: {content}")
+            logger.warning("Error parsing Claude response: %s (response: %s)", e, content)
 
     except Exception as e:
-        print(f"❌ Claude API error: {e}")
+        logger.exception("❌ Claude API error: %s", e)
 
-    return {
-        'weight': 0.0,
-        'unit': 'g',
-        'name': 'Unknown',
-        'description': 'Unable to identify',
-        'category': 'Other',
-        'confidence': 0.0,
-        'error': 'Failed to read weight from image',
-        'method': 'claude_api'
-    }
+    return WEIGHT_READ_FAILED_RESULT
+
+async def capture_weight_from_image(farmer_id: str, image_data: bytes) -> JSONResponse:
+    """Read the weight from raw image bytes, record the product and build the response"""
+    loop = asyncio.get_running_loop()
+    # Identical images (client retries, polling dashboards) reuse the
+    # previous Claude result instead of being decoded and sent again
+    digest = await loop.run_in_executor(image_pool, image_digest, image_data)
+    weight_data = weight_cache.get(digest)
+
+    if weight_data is None:
+        image_base64 = await loop.run_in_executor(image_pool, encode_for_claude, image_data)
+
+        if image_base64 is None:
+            return JSONResponse(
+                status_code=400,
+                content={"error": "Invalid image data"}
+            )
+
+        # Extract weight from scale using Claude API
+        weight_data = await extract_weight_from_scale(image_base64)
+        if weight_data['weight'] > 0:
+            weight_cache[digest] = weight_data
+    else:
+        logger.info("♻️  Reusing cached weight for identical image")
+
+    # Validate weight
+    if weight_data['weight'] <= 0:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid weight value", "weight": weight_data['weight']}
+        )
+
+    # Write to Google Sheets
+    product_id = None
+    try:
+        if sheets_service:
+            product_id = await write_to_google_sheets({
+                'farmer_id': farmer_id,
+                'produce_name': weight_data.get('name', 'Unknown Produce'),  # Use Claude-detected name
+                'weight': weight_data['weight'],
+                'unit': weight_data['unit'],
+                'description': weight_data.get('description', ''),
+                'category': weight_data.get('category', 'other')
+            })
+            logger.info("✅ Saved to Google Sheets: %s", product_id)
+        else:
+            logger.warning("⚠️  Google Sheets not initialized, skipping database write")
+    except Exception as e:
+        logger.exception("❌ Failed to write to Google Sheets: %s", e)
+
+    # Return data in Creao-compatible format
+    return JSONResponse(content={
+        "status": "success",
+        "farmer_id": farmer_id,
+        "weight_data": {
+            "weight": weight_data['weight'],
+            "unit": weight_data['unit'],
+            "confidence": weight_data.get('confidence', 0.95),
+            "raw_text": f"{weight_data['weight']} {weight_data['unit']}",
+            "method": weight_data.get('method', 'claude_api')
+        },
+        "message": f"Weight {weight_data['weight']} {weight_data['unit']} captured!",
+        "creao_logged": False,
+        "id": product_id,
+        "seller_id": farmer_id,
+        "name": weight_data.get('name', 'Unknown Produce'),  # Use Claude-detected name
+        "description": weight_data.get('description', ''),
+        "category": weight_data.get('category', 'other'),
+        "price": weight_data['weight'],
+        "unit": weight_data['unit']
+    })
 
 @app.post("/api/v1/capture/weight",
           summary="Capture Weight from Scale Image",
@@ -315,13 +585,10 @@ async def capture_weight(
     # api_key: str = Depends(verify_api_key)
 ):
     # Debug logging
-    print(f"🔍 Received request from Creao:")
-    print(f"   - farmer_id: {request.farmer_id}")
-    print(f"   - produce_name: {request.produce_name}")
-    print(f"   - image_base64 length: {len(request.image_base64) if request.image_base64 else 0}")
-    print(f"   - image_url: {request.image_url}")
-    print(f"   - using: {'base64' if request.image_base64 else 'URL' if request.image_url else 'neither'}")
-    # print(f"   - API key: {api_key[:10]}...")
+    logger.info("🔍 Received request from Creao: farmer_id=%s produce_name=%s image_base64_length=%d image_url=%s",
+                request.farmer_id, request.produce_name,
+                len(request.image_base64) if request.image_base64 else 0, request.image_url)
+    # logger.debug("API key: %s...", api_key[:10])
 
     try:
         # Process image from either base64 or URL
@@ -334,21 +601,17 @@ async def capture_weight(
         try:
             if request.image_base64:
                 # Process base64 image
-                image_base64 = request.image_base64.strip()
-                # Add padding if needed
-                padding = len(image_base64) % 4
-                if padding:
-                    image_base64 += '=' * (4 - padding)
-                image_data = base64.b64decode(image_base64)
+                image_data = await asyncio.get_running_loop().run_in_executor(
+                    image_pool, decode_base64_image, request.image_base64)
 
             elif request.image_url:
                 # Process image URL
                 image_url = request.image_url.strip()
-                print(f"Fetching image from URL: {image_url}")
-                response = requests.get(image_url, timeout=30)
+                logger.info("Fetching image from URL: %s", image_url)
+                response = await run_in_threadpool(requests.get, image_url, timeout=30)
                 response.raise_for_status()  # Raise exception for bad status codes
                 image_data = response.content
-                print(f"Successfully fetched image ({len(image_data)} bytes)")
+                logger.info("Successfully fetched image (%d bytes)", len(image_data))
 
         except requests.RequestException as e:
             return JSONResponse(
@@ -360,64 +623,36 @@ async def capture_weight(
                 status_code=400,
                 content={"error": f"Invalid image data: {str(decode_error)}"}
             )
-        nparr = np.frombuffer(image_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        return await capture_weight_from_image(request.farmer_id, image_data)
 
-        if frame is None:
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Invalid image data"}
-            )
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": str(e)}
+        )
 
-        # Extract weight from scale using Claude API
-        weight_data = await extract_weight_from_scale(frame)
+@app.post("/api/v1/capture/weight/upload",
+          summary="Capture Weight from Uploaded Scale Image",
+          description="Extract weight value from a digital scale image sent as multipart/form-data, avoiding base64 overhead",
+          response_description="Weight data extracted from the image",
+          tags=["Weight Capture"])
+async def capture_weight_upload(
+    farmer_id: str = Form(...),
+    produce_name: str = Form(...),
+    image: UploadFile = File(...),
+):
+    logger.info("🔍 Received upload: farmer_id=%s produce_name=%s filename=%s",
+                farmer_id, produce_name, image.filename)
 
-        # Validate weight
-        if weight_data['weight'] <= 0:
+    try:
+        image_data = await image.read()
+        if not image_data:
             return JSONResponse(
                 status_code=400,
-                content={"error": "Invalid weight value", "weight": weight_data['weight']}
+                content={"error": "image file is empty"}
             )
 
-        # Write to Google Sheets
-        product_id = None
-        try:
-            if sheets_service:
-                product_id = await write_to_google_sheets({
-                    'farmer_id': request.farmer_id,
-                    'produce_name': weight_data.get('name', 'Unknown Produce'),  # Use Claude-detected name
-                    'weight': weight_data['weight'],
-                    'unit': weight_data['unit'],
-                    'description': weight_data.get('description', ''),
-                    'category': weight_data.get('category', 'other')
-                })
-                print(f"✅ Saved to Google Sheets: {product_id}")
-            else:
-                print("⚠️  Google Sheets not initialized, skipping database write")
-        except Exception as e:
-            print(f"❌ Failed to write to Google Sheets: {e}")
-
-        # Return data in Creao-compatible format
-        return JSONResponse(content={
-            "status": "success",
-            "farmer_id": request.farmer_id,
-            "weight_data": {
-                "weight": weight_data['weight'],
-                "unit": weight_data['unit'],
-                "confidence": weight_data.get('confidence', 0.95),
-                "raw_text": f"{weight_data['weight']} {weight_data['unit']}",
-                "method": weight_data.get('method', 'claude_api')
-            },
-            "message": f"Weight {weight_data['weight']} {weight_data['unit']} captured!",
-            "creao_logged": False,
-            "id": product_id,
-            "seller_id": request.farmer_id,
-            "name": weight_data.get('name', 'Unknown Produce'),  # Use Claude-detected name
-            "description": weight_data.get('description', ''),
-            "category": weight_data.get('category', 'other'),
-            "price": weight_data['weight'],
-            "unit": weight_data['unit']
-        })
+        return await capture_weight_from_image(farmer_id, image_data)
 
     except Exception as e:
         return JSONResponse(
@@ -427,35 +662,55 @@ async def capture_weight(
 
 @app.websocket("/ws/stream")
 async def websocket_endpoint(websocket: WebSocket):
+    if model is None:
+        # Close before any frames are sent so clients see why straight away
+        await websocket.accept()
+        await websocket.close(code=1011, reason="Produce detection model not loaded")
+        return
+
     await manager.connect(websocket)
+    loop = asyncio.get_running_loop()
+    last_hash, last_jpeg, last_result = None, None, None
     try:
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
-
-            if message.get("type") == "frame":
-                # Decode base64 image
-                image_data = base64.b64decode(message["data"])
-                nparr = np.frombuffer(image_data, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-                if frame is not None:
-                    annotated_frame, detection_result = detect_produce(frame)
-
-                    # Encode annotated frame to base64
-                    _, buffer = cv2.imencode('.jpg', annotated_frame)
-                    annotated_base64 = base64.b64encode(buffer).decode('utf-8')
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                # Text frames come from clients on the old base64/JSON protocol
+                await websocket.close(code=1003, reason="Frames must be sent as binary messages")
+                break
+            if len(data) < FRAME_HEADER.size:
+                continue
+            message_type, timestamp = FRAME_HEADER.unpack_from(data)
+
+            if message_type == FRAME_MESSAGE_TYPE:
+                decoded = await loop.run_in_executor(image_pool, decode_stream_frame, data)
+
+                if decoded is not None:
+                    frame, frame_hash = decoded
+                    # Static scenes produce near-identical frames; reuse the
+                    # last detection and its encoded frame when the hash
+                    # barely changes
+                    if last_hash is None or bin(frame_hash ^ last_hash).count('1') >= FRAME_HASH_THRESHOLD:
+                        last_jpeg, last_result = await loop.run_in_executor(
+                            detection_pool, detect_and_encode, frame)
+                        last_hash = frame_hash
 
                     response = {
                         "type": "detection",
-                        "timestamp": message.get("timestamp"),
-                        "detection": detection_result,
-                        "annotated_frame": annotated_base64
+                        "timestamp": timestamp,
+                        "detection": last_result
                     }
-
                     await manager.send_message(json.dumps(response), websocket)
 
+                    # Send the annotated frame as raw JPEG bytes right after
+                    await manager.send_bytes(last_jpeg, websocket)
+
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 @app.get("/",
@@ -464,18 +719,21 @@ async def websocket_endpoint(websocket: WebSocket):
          tags=["Health"])
 async def root():
     """Get API status and version information"""
+    endpoints = {
+        "weight_capture": "/api/v1/capture/weight",
+        "weight_capture_upload": "/api/v1/capture/weight/upload",
+        "weight_test": "/test_weight_capture.html",
+        "docs": "/docs",
+        "health": "/health"
+    }
+    if model is not None:
+        endpoints["produce_detection"] = "/webcam_client.html"
     return {
         "status": "FarmFresh Marketplace - Smart Camera Service",
         "version": "1.0.0",
         "description": "AI-powered computer vision service for family farms to capture produce weight and manage inventory",
         "marketplace": "FarmFresh - Connecting Family Farms with Smart Technology",
-        "endpoints": {
-            "weight_capture": "/api/v1/capture/weight",
-            "produce_detection": "/webcam_client.html",
-            "weight_test": "/test_weight_capture.html",
-            "docs": "/docs",
-            "health": "/health"
-        }
+        "endpoints": endpoints
     }
 
 @app.get("/health",
@@ -490,39 +748,78 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# Static client pages are read once per worker and cached by browsers
+HTML_CACHE_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+
+@lru_cache(maxsize=4)
+def load_html(path: str) -> str:
+    """Read a static HTML page once and keep it in memory"""
+    with open(path, "r") as f:
+        return f.read()
+
 @app.get("/webcam_client.html", response_class=HTMLResponse)
 async def webcam_client():
     try:
-        with open("webcam_client.html", "r") as f:
-            return HTMLResponse(content=f.read())
+        return HTMLResponse(content=load_html("webcam_client.html"), headers=HTML_CACHE_HEADERS)
     except FileNotFoundError:
         return HTMLResponse(content="<h1>Webcam client not found</h1>", status_code=404)
 
 @app.get("/test_weight_capture.html", response_class=HTMLResponse)
 async def test_weight_capture():
     try:
-        with open("test_weight_capture.html", "r") as f:
-            return HTMLResponse(content=f.read())
+        return HTMLResponse(content=load_html("test_weight_capture.html"), headers=HTML_CACHE_HEADERS)
     except FileNotFoundError:
         return HTMLResponse(content="<h1>Test client not found</h1>", status_code=404)
 
+@app.on_event("startup")
+async def warm_up():
+    """Initialize services and warm the image codecs before the first request"""
+    init_google_sheets()
+
+    # Round-trip a dummy frame so libjpeg and OpenCV's thread pool are loaded
+    # here rather than inside the first capture request
+    _, buffer = cv2.imencode('.jpg', np.zeros((600, 800, 3), np.uint8), [cv2.IMWRITE_JPEG_QUALITY, 90])
+    cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+# Upper bound for the default worker count; matches start.sh
+MAX_DEFAULT_WORKERS = 8
+
+
+def default_worker_count() -> int:
+    """Two workers per CPU this process may run on, capped at MAX_DEFAULT_WORKERS"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        # macOS and Windows have no CPU affinity API
+        cpus = os.cpu_count() or 1
+    return min(2 * cpus, MAX_DEFAULT_WORKERS)
+
 if __name__ == "__main__":
     import uvicorn
 
-    # Initialize Google Sheets service
-    init_google_sheets()
-
     port = int(os.getenv("PORT", 8000))
+    # Claude calls are network-bound, so two workers per usable core keep the
+    # cores busy. Capped at MAX_DEFAULT_WORKERS because each worker loads its
+    # own libraries, thread pools and weight cache; set WEB_CONCURRENCY to the
+    # container's CPU quota on hosts that expose more CPUs than they grant
+    workers = int(os.getenv("WEB_CONCURRENCY", default_worker_count()))
     print("="*60)
     print("FarmFresh Marketplace - Smart Camera Service")
     print("Connecting Family Farms with AI Technology")
     print("="*60)
-    print(f"Starting server on http://0.0.0.0:{port}")
+    print(f"Starting server on http://0.0.0.0:{port} ({workers} workers)")
     print("\nAvailable Marketplace Services:")
     print(f"  http://0.0.0.0:{port}/test_weight_capture.html (Smart Weight Capture)")
-    print(f"  http://0.0.0.0:{port}/webcam_client.html (Produce Detection)")
     print(f"  POST http://0.0.0.0:{port}/api/v1/capture/weight (API endpoint)")
-    print(f"  WebSocket ws://0.0.0.0:{port}/ws/stream (Real-time detection)")
+    print(f"  POST http://0.0.0.0:{port}/api/v1/capture/weight/upload (multipart API endpoint)")
+    if model is not None:
+        print(f"  http://0.0.0.0:{port}/webcam_client.html (Produce Detection)")
+        print(f"  WebSocket ws://0.0.0.0:{port}/ws/stream (Real-time detection)")
     print(f"  http://0.0.0.0:{port}/docs (API Documentation)")
     print("="*60)
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Multiple workers require an import string. "auto" picks uvloop and
+    # httptools when installed (uvicorn[standard] on Linux/macOS) and falls
+    # back to asyncio/h11 elsewhere, e.g. on Windows
+    uvicorn.run("app:app", host="0.0.0.0", port=port, workers=workers,
+                loop="auto", http="auto")
@@ -10,6 +10,16 @@ export PYTHONDONTWRITEBYTECODE=1
 # Create necessary directories
 mkdir -p ~/.cache/torch/hub/checkpoints
 
-# Start the application directly
-echo "🎯 Starting FastAPI server..."
-exec python app.py
+# Two workers per usable core (nproc honours CPU affinity), capped at 8 so
+# hosts that expose many CPUs don't start dozens of memory-hungry workers.
+# nproc ignores the container's CPU quota; set WEB_CONCURRENCY to match it
+MAX_DEFAULT_WORKERS=8
+DEFAULT_WORKERS=$((2 * $(nproc)))
+if [ "$DEFAULT_WORKERS" -gt "$MAX_DEFAULT_WORKERS" ]; then
+    DEFAULT_WORKERS=$MAX_DEFAULT_WORKERS
+fi
+WORKERS=${WEB_CONCURRENCY:-$DEFAULT_WORKERS}
+
+# Start the application under uvicorn's process manager
+echo "🎯 Starting FastAPI server with $WORKERS workers..."
+exec uvicorn app:app --host 0.0.0.0 --port "${PORT:-8000}" --workers "$WORKERS" --loop uvloop --http httptools
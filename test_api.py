@@ -2,21 +2,114 @@
 """
 Simple test script for the deployed Smart Camera API
 Replace YOUR_RAILWAY_URL with your actual Railway URL
+
+Load test mode:
+  python test_api.py --load --repeat 50 --concurrency 8
 """
 
-import requests
-import base64
+import argparse
+import asyncio
+import importlib.util
+import statistics
+import sys
+import time
+import httpx
 from pathlib import Path
 
+# pybase64's SIMD encoder is much faster on multi-MB images; fall back to the
+# stdlib when it is not installed
+try:
+    import pybase64 as b64
+except ImportError:
+    import base64 as b64
+
+# orjson serializes straight to bytes and parses several times faster than the
+# stdlib; fall back to json when it is not installed
+try:
+    import orjson
+
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    import json
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
+    json_loads = json.loads
+
 # Replace with your Railway URL
 API_URL = "https://calhacks2025-production.up.railway.app"
 
+# Gateway errors from the Railway edge are usually transient
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+# A gateway error can arrive after the server already appended a product row
+# to Google Sheets, so only idempotent requests are retried on status
+RETRY_METHODS = frozenset({"GET", "HEAD"})
+
+
+class RetryTransport(httpx.HTTPTransport):
+    """HTTP transport that retries gateway errors with exponential backoff
+
+    Connection failures are retried by the underlying connection pool; this
+    adds the same number of retries for RETRY_STATUSES responses to
+    RETRY_METHODS requests.
+    """
+
+    def __init__(self, retries=3, backoff_factor=0.3, **kwargs):
+        super().__init__(retries=retries, **kwargs)
+        self.status_retries = retries
+        self.backoff_factor = backoff_factor
+
+    def handle_request(self, request):
+        retries = self.status_retries if request.method in RETRY_METHODS else 0
+        for attempt in range(retries + 1):
+            response = super().handle_request(request)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            response.close()
+            time.sleep(self.backoff_factor * 2 ** attempt)
+
+# (method, path, status, seconds, bytes) for every call made through CLIENT
+METRICS = []
+
+
+def record_metrics(response):
+    """Response hook that records timing and size for the summary table"""
+    response.read()
+    METRICS.append((response.request.method, response.request.url.path, response.status_code,
+                    response.elapsed.total_seconds(), len(response.content)))
+
+
+def print_metrics():
+    """Print a table of the calls made through CLIENT, slowest first"""
+    if not METRICS:
+        return
+    print("📊 Request metrics")
+    print(f"  {'Method':<7}{'Path':<36}{'Status':>7}{'Elapsed':>11}{'Bytes':>10}")
+    for method, path, status, elapsed, size in sorted(METRICS, key=lambda m: m[3], reverse=True):
+        print(f"  {method:<7}{path:<36}{status:>7}{elapsed * 1000:>8.1f} ms{size:>10}")
+    print()
+
+# Reuse one client so every test shares a single connection; with the h2
+# package installed (pip install "httpx[http2]") requests are multiplexed over
+# one HTTP/2 connection instead of queuing on HTTP/1.1 keep-alive
+HTTP2 = importlib.util.find_spec("h2") is not None
+CLIENT = httpx.Client(
+    timeout=30.0,
+    transport=RetryTransport(http2=HTTP2),
+    event_hooks={"response": [record_metrics]}
+)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
 def test_health():
     """Test health endpoint"""
     print("🏥 Testing health endpoint...")
-    response = requests.get(f"{API_URL}/health")
+    response = CLIENT.get(f"{API_URL}/health")
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {json_loads(response.content)}")
     print()
 
 def test_weight_capture_url(image_url):
@@ -30,13 +123,14 @@ def test_weight_capture_url(image_url):
         "image_url": image_url
     }
 
-    response = requests.post(
+    response = CLIENT.post(
         f"{API_URL}/api/v1/capture/weight",
-        json=payload
+        content=json_dumps(payload),
+        headers=JSON_HEADERS
     )
 
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {json_loads(response.content)}")
     print()
 
 def test_weight_capture(image_path):
@@ -46,7 +140,7 @@ def test_weight_capture(image_path):
     # Read and encode image
     with open(image_path, "rb") as f:
         image_data = f.read()
-        image_base64 = base64.b64encode(image_data).decode('utf-8')
+        image_base64 = b64.b64encode(image_data).decode('ascii')
 
     # Make request
     payload = {
@@ -55,16 +149,89 @@ def test_weight_capture(image_path):
         "image_base64": image_base64
     }
 
-    response = requests.post(
+    response = CLIENT.post(
         f"{API_URL}/api/v1/capture/weight",
-        json=payload
+        content=json_dumps(payload),
+        headers=JSON_HEADERS
     )
 
     print(f"Status: {response.status_code}")
-    print(f"Response: {response.json()}")
+    print(f"Response: {json_loads(response.content)}")
+    print()
+
+def test_weight_capture_upload(image_path):
+    """Test weight capture by streaming the image as multipart/form-data"""
+    print(f"📤 Testing weight capture upload with {image_path}...")
+
+    # The raw file is streamed as-is; no base64 or JSON escaping
+    with open(image_path, "rb") as f:
+        response = CLIENT.post(
+            f"{API_URL}/api/v1/capture/weight/upload",
+            data={"farmer_id": "test_farmer_001", "produce_name": "apples"},
+            files={"image": (Path(image_path).name, f, "image/jpeg")}
+        )
+
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json_loads(response.content)}")
+    print()
+
+async def load_test(path, repeat, concurrency):
+    """Run concurrent workers against an endpoint and report latency percentiles"""
+    print(f"🔥 Load testing {path}: {concurrency} workers x {repeat} requests...")
+
+    async def worker(client):
+        # Only successful responses contribute latency samples; fast
+        # failures (refused connections, 5xx) would otherwise drag the
+        # percentiles down and inflate throughput
+        latencies = []
+        errors = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                response = await client.get(f"{API_URL}{path}")
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                # Connection failures and timeouts are what a load test is
+                # meant to surface; count them rather than abort the run
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+        return latencies, errors
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(http2=HTTP2, timeout=30.0, limits=limits) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+    errors = sum(worker_errors for _, worker_errors in results)
+    print(f"Requests: {len(latencies) + errors} in {elapsed:.2f}s "
+          f"({len(latencies)} succeeded, {errors} failed)")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} successful req/s")
+    if len(latencies) > 1:
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(f"Latency P50: {percentiles[49] * 1000:.1f} ms, "
+              f"P95: {percentiles[94] * 1000:.1f} ms, "
+              f"P99: {percentiles[98] * 1000:.1f} ms (successful requests)")
     print()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the Smart Camera API")
+    parser.add_argument("--load", action="store_true", help="run the load test instead of the interactive tests")
+    parser.add_argument("--repeat", type=int, default=20, help="sequential requests per worker in load mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent workers in load mode")
+    parser.add_argument("--path", default="/health", help="endpoint to load test")
+    args = parser.parse_args()
+
+    if args.load:
+        # Only GET endpoints are load tested; capture requests call Claude and
+        # write rows to Google Sheets
+        asyncio.run(load_test(args.path, args.repeat, args.concurrency))
+        sys.exit(0)
+
     print("🚀 Testing Smart Camera API\n")
 
     # Test health
@@ -81,7 +248,9 @@ if __name__ == "__main__":
     # Test with a local image if provided
     image_path = input("Enter path to local test image (or press Enter to skip): ").strip()
     if image_path and Path(image_path).exists():
+        # Base64 JSON is what Creao sends; multipart is the upload endpoint
         test_weight_capture(image_path)
+        test_weight_capture_upload(image_path)
     else:
         print("Skipping local image test (no valid image provided)")
         print()
@@ -91,3 +260,6 @@ if __name__ == "__main__":
         print("Examples:")
         print("  - URL: https://example.com/scale_image.jpg")
         print("  - Local: path/to/scale_image.jpg")
+        print()
+
+    print_metrics()